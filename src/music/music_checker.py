@@ -1,6 +1,7 @@
 import collections
 import logging
-from typing import Iterable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Set
 
 import requests
 
@@ -15,16 +16,18 @@ logger = logging.getLogger(__name__)
 class MusicChecker:
 
     VALID_YOUTUBE_TRACKS_CACHE = "valid_youtube_tracks.json"
+    MAX_WORKERS = 16
 
-    def do_all_checks(self, groups: Iterable[MusicGroup], default_dir):
+    def do_all_checks(self, groups: Iterable[MusicGroup], default_dir, verified_paths: Set[str] = None):
         """
         Perform all the available checks.
 
         :param groups: `MusicGroup` instances to check
         :param default_dir: default directory where the tracks are located
+        :param verified_paths: set to which the paths of the existing files are added (Optional)
         """
         self.check_track_list_names(groups)
-        self.check_tracks_do_exist(groups, default_dir)
+        self.check_tracks_do_exist(groups, default_dir, verified_paths)
 
     def check_track_list_names(self, groups: Iterable[MusicGroup]):
         """
@@ -55,26 +58,43 @@ class MusicChecker:
                     raise RuntimeError(f"'{next_name}' points to a non-existing track list.")
         logger.info("Success! Names are unique and `next` parameters point to existing track lists.")
 
-    def check_tracks_do_exist(self, groups: Iterable[MusicGroup], default_dir):
+    def check_tracks_do_exist(self, groups: Iterable[MusicGroup], default_dir, verified_paths: Set[str] = None):
         """
         Iterates through every track and attempts to get its path. Logs any error and re-raises any exception.
+        The files are checked in parallel threads, the paths of the existing ones are added to `verified_paths`
+        (if given) so that they do not have to be checked again.
         """
         logger.info("Checking that tracks point to valid paths...")
         valid_youtube_tracks = collections.deque(cache.load_list(self.VALID_YOUTUBE_TRACKS_CACHE), maxlen=100)
+        file_tuples = []
         for group, track_list, track in utils.music_tuple_generator(groups):
-            try:
-                if not track.is_youtube_link:
-                    utils.get_track_path(group, track_list, track, default_dir=default_dir)
-                else:  # This is much faster to check if the link is a YouTube video
-                    if track.file in valid_youtube_tracks:
-                        continue
-                    url = f"https://www.youtube.com/oembed?url={track.file}"
-                    result = requests.get(url)
-                    if result.status_code != 200:
-                        raise RuntimeError(f"The url '{track.file}' is not a valid YouTube video.")
-                    valid_youtube_tracks.append(track.file)
+            if not track.is_youtube_link:
+                file_tuples.append((group, track_list, track))
+                continue
+            try:  # This is much faster to check if the link is a YouTube video
+                if track.file in valid_youtube_tracks:
+                    continue
+                url = f"https://www.youtube.com/oembed?url={track.file}"
+                result = requests.get(url)
+                if result.status_code != 200:
+                    raise RuntimeError(f"The url '{track.file}' is not a valid YouTube video.")
+                valid_youtube_tracks.append(track.file)
             except Exception as ex:
                 logger.error(f"Track '{track.file}' does not point to a valid path.")
                 raise ex
         cache.save_list(list(valid_youtube_tracks), self.VALID_YOUTUBE_TRACKS_CACHE)
+
+        def get_track_path(music_tuple):
+            group, track_list, track = music_tuple
+            try:
+                return utils.get_track_path(
+                    group, track_list, track, default_dir=default_dir, verified_paths=verified_paths
+                )
+            except Exception as ex:
+                logger.error(f"Track '{track.file}' does not point to a valid path.")
+                raise ex
+
+        with ThreadPoolExecutor(max_workers=self.MAX_WORKERS) as executor:
+            for _ in executor.map(get_track_path, file_tuples):  # re-raises the exceptions of the threads
+                pass
         logger.info("Success! All tracks point to valid paths.")
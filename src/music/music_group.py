@@ -1,9 +1,13 @@
+from operator import attrgetter
 from typing import Dict
 
 from src.music.track_list import TrackList
 
 
 class MusicGroup:
+
+    __slots__ = ("name", "directory", "track_lists")
+
     def __init__(self, config: Dict):
         """
         Initializes a `MusicGroup` instance.
@@ -20,21 +24,17 @@ class MusicGroup:
         :param config: `dict`
         """
         self.name = config["name"]
-        self.directory = config["directory"] if "directory" in config else None
+        self.directory = config.get("directory")
         track_lists = [TrackList(track_list_config) for track_list_config in config["track_lists"]]
-        if "sort" not in config or ("sort" in config and config["sort"]):
-            track_lists = sorted(track_lists, key=lambda x: x.name)
+        if config.get("sort", True):
+            track_lists.sort(key=attrgetter("name"))
         self.track_lists = tuple(track_lists)
 
+    def _key(self):
+        """
+        Returns a tuple of the attributes that are compared for equality.
+        """
+        return self.name, self.directory, self.track_lists
+
     def __eq__(self, other):
-        if isinstance(other, MusicGroup):
-            attrs_are_the_same = self.name == other.name and self.directory == other.directory
-            if not attrs_are_the_same:
-                return False
-            if len(self.track_lists) != len(other.track_lists):
-                return False
-            for my_track_list, other_track_list in zip(self.track_lists, other.track_lists):
-                if my_track_list != other_track_list:
-                    return False
-            return True
-        return False
+        return isinstance(other, MusicGroup) and self._key() == other._key()
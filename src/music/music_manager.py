@@ -1,7 +1,9 @@
 import asyncio
 import logging
+import random
 from collections import namedtuple
-from typing import Callable, Dict
+from operator import attrgetter
+from typing import Callable, Dict, Optional, Tuple
 
 import vlc
 from aiohttp.web_request import Request
@@ -19,11 +21,14 @@ from src.music.track_list import TrackList
 logger = logging.getLogger(__name__)
 
 CurrentlyPlaying = namedtuple("CurrentlyPlaying", ["group_index", "track_list_index", "task"])
+PreloadedMedia = namedtuple("PreloadedMedia", ["track", "task"])
 
 
 class MusicManager:
 
     SLEEP_TIME = 0.01
+    PLAYING_TIMEOUT = 0.5
+    VOLUME_TRANSITION_SECONDS = 2
     VALID_YOUTUBE_TRACKS_CACHE = "valid_youtube_tracks.json"
 
     def __init__(self, config: Dict, callback_fn: Callable[[MusicActions, Request, MusicCallbackInfo], None] = None):
@@ -45,32 +50,48 @@ class MusicManager:
         :param callback_fn: function to call when the active music changes
         """
         self.volume = int(config["volume"])
-        self.directory = config["directory"] if "directory" in config else None
+        self.directory = config.get("directory")
         groups = [MusicGroup(group_config) for group_config in config["groups"]]
-        if "sort" not in config or ("sort" in config and config["sort"]):
-            groups = sorted(groups, key=lambda x: x.name)
+        if config.get("sort", True):
+            groups.sort(key=attrgetter("name"))
         self.groups = tuple(groups)
         self._currently_playing = None
         self._current_player = None
+        self._stopped = None
+        self._vlc_instance = None
+        self._player = None
+        self._event_manager = None
+        self._preloaded_media = None
+        self._volume_transition_handles = []
+        self._fading_out = False
+        self._verified_paths = set()
+        self._root_directories = self._get_root_directories()
         self.callback_handler = MusicCallbackHandler(callback_fn=callback_fn)
-        MusicChecker().do_all_checks(self.groups, self.directory)
+        MusicChecker().do_all_checks(self.groups, self.directory, self._verified_paths)
+
+    def _key(self):
+        """
+        Returns a tuple of the attributes that are compared for equality.
+        """
+        return self.volume, self.directory, self._currently_playing, self.groups
 
     def __eq__(self, other):
-        if isinstance(other, MusicManager):
-            attrs_are_the_same = (
-                self.volume == other.volume
-                and self.directory == other.directory
-                and self._currently_playing == other._currently_playing
-            )
-            if not attrs_are_the_same:
-                return False
-            if len(self.groups) != len(other.groups):
-                return False
-            for my_group, other_group in zip(self.groups, other.groups):
-                if my_group != other_group:
-                    return False
-            return True
-        return False
+        return isinstance(other, MusicManager) and self._key() == other._key()
+
+    def _get_root_directories(self) -> Dict[Tuple[int, int], str]:
+        """
+        Returns the root directory of every track list by the index of its group and its index within the group.
+        The root directory is `None` if no directory is specified for the track list.
+        """
+        root_directories = {}
+        for group_index, group in enumerate(self.groups):
+            for track_list_index, track_list in enumerate(group.track_lists):
+                try:
+                    root_directory = utils.get_track_list_root_directory(group, track_list, default_dir=self.directory)
+                except ValueError:
+                    root_directory = None  # fine for YouTube links, other tracks will fail to play
+                root_directories[(group_index, track_list_index)] = root_directory
+        return root_directories
 
     @property
     def currently_playing(self) -> MusicCallbackInfo:
@@ -94,24 +115,24 @@ class MusicManager:
         """
         if self._currently_playing is not None:
             self._currently_playing.task.cancel()
-            while self._currently_playing is not None:  # wait till track list finishes cancelling
-                await asyncio.sleep(self.SLEEP_TIME)
+            await self._stopped.wait()  # wait till track list finishes cancelling
 
     async def play_track_list(self, request, group_index, track_list_index):
         """
         Creates an asynchronous task to play the track list at the given index.
         If a track list is already being played, it will be cancelled and the new track list will be played.
         """
-        logger.debug(f"Received request to play music from group {group_index} at index " f"{track_list_index}")
+        logger.debug("Received request to play music from group %s at index %s", group_index, track_list_index)
         await self.cancel()
         loop = asyncio.get_event_loop()
+        self._stopped = asyncio.Event()
         self._currently_playing = CurrentlyPlaying(
             group_index,
             track_list_index,
             loop.create_task(self._play_track_list(request, group_index, track_list_index)),
         )
-        logger.debug(f"Created a task to play music from group {group_index} at index " f"{track_list_index}")
-        await asyncio.sleep(self.SLEEP_TIME)  # Return to the event loop that will start the task
+        logger.debug("Created a task to play music from group %s at index %s", group_index, track_list_index)
+        await asyncio.sleep(0)  # Return to the event loop that will start the task
 
     async def _play_track_list(self, request, group_index, track_list_index):
         """
@@ -121,66 +142,246 @@ class MusicManager:
         track_list = group.track_lists[track_list_index]
         cancelled = False
         try:
-            logger.info(f"Loading '{track_list.name}'")
+            logger.info("Loading '%s'", track_list.name)
             await self.callback_handler(action=MusicActions.START, request=request, music_info=self.currently_playing)
+            root_directory = self._root_directories.get((group_index, track_list_index))
+            tracks = track_list.tracks  # a new list if shuffled, so it can be reshuffled in place for every loop
             while True:
-                for track in track_list.tracks:
-                    await self._play_track(group, track_list, track)
+                for index, track in enumerate(tracks):
+                    next_track = tracks[index + 1] if index + 1 < len(tracks) else None
+                    await self._play_track(group, track_list, track, next_track, root_directory)
                 if not track_list.loop:
                     break
-            logger.info(f"Finished '{track_list.name}'")
+                if track_list.shuffle:
+                    random.shuffle(tracks)
+            logger.info("Finished '%s'", track_list.name)
             await self.callback_handler(action=MusicActions.FINISH, request=request, music_info=self.currently_playing)
         except asyncio.CancelledError:
-            logger.info(f"Cancelled '{track_list.name}'")
+            logger.info("Cancelled '%s'", track_list.name)
             await self.callback_handler(action=MusicActions.STOP, request=request, music_info=self.currently_playing)
             cancelled = True
             raise
         finally:
+            self._cancel_volume_transition()
             if self._current_player is not None:
                 self._current_player.stop()
             self._currently_playing = None
             self._current_player = None
+            self._cancel_preload()
+            if self._stopped is not None:
+                self._stopped.set()
             if not cancelled and track_list.next is not None:
                 await self._play_next_track_list(request, track_list)
 
-    async def _play_track(self, group: MusicGroup, track_list: TrackList, track: Track):
+    async def _play_track(
+        self, group: MusicGroup, track_list: TrackList, track: Track, next_track: Track = None, root_directory=None
+    ):
         """
         Plays the given track from the given track list and group.
+        Once the track is playing, the `next_track` (if given) is preloaded in the background.
+        The `root_directory` of the track list is looked up if it is not given.
         """
+        media = await self._get_media(group, track_list, track, root_directory)
+        player = self._get_player()
+        self._current_player = player
+        player.set_media(media)
+        playing = self._get_playing_event(self._event_manager)
+        finished = self._get_finished_event(self._event_manager)
         try:
-            path = utils.get_track_path(group, track_list, track, default_dir=self.directory)
-        except ValueError:
-            logger.error(f"Failed to play '{track.file}'.")
-            raise asyncio.CancelledError()
-        self._current_player = vlc.MediaPlayer(vlc.Instance("--novideo"), path)
-        self._current_player.audio_set_volume(0)
-        success = self._current_player.play()
-        if success == -1:
-            logger.error(f"Failed to play {path}")
-            raise asyncio.CancelledError
-        if track.start_at is not None:
-            self._current_player.set_time(track.start_at)
-        logger.info(f"Now Playing: {track.file}")
-        await self._wait_for_current_player_to_be_playing()
-        await self._set_master_volume(self.volume, set_global=False)
-        while self._current_player.is_playing():
+            player.audio_set_volume(0)
+            success = player.play()
+            if success == -1:
+                logger.error("Failed to play %s", media.get_mrl())
+                raise asyncio.CancelledError
+            if track.start_at is not None:
+                player.set_time(track.start_at)
+            logger.info("Now Playing: %s", track.file)
+            if not await self._wait_for_current_player_to_be_playing(playing, finished):
+                logger.error("Failed to play %s", media.get_mrl())
+                raise asyncio.CancelledError
+            await self._set_master_volume(self.volume, set_global=False)
+            if next_track is not None:
+                self._cancel_preload()
+                self._preloaded_media = PreloadedMedia(
+                    next_track,
+                    asyncio.get_event_loop().create_task(
+                        self._preload_track(group, track_list, next_track, root_directory)
+                    ),
+                )
+            end_handle = None
+            if track.end_at is not None:
+                start_at = track.start_at if track.start_at is not None else 0
+                end_handle = asyncio.get_event_loop().call_later((track.end_at - start_at) / 1000, finished.set)
             try:
-                if track.end_at is not None and self._current_player.get_time() >= track.end_at:
-                    self._current_player.stop()
-                await asyncio.sleep(self.SLEEP_TIME)
+                await finished.wait()
             except asyncio.CancelledError:
-                logger.debug(f"Received cancellation request for {track.file}")
+                logger.debug("Received cancellation request for %s", track.file)
                 await self._set_master_volume(0, set_global=False)
+                self._fading_out = True  # volume changes from now on must not interrupt the fade-out
+                try:
+                    await asyncio.sleep(self.VOLUME_TRANSITION_SECONDS)  # let the music fade out
+                finally:
+                    self._fading_out = False
                 raise
-        logger.info(f"Finished playing: {track.file}")
+            finally:
+                if end_handle is not None:
+                    end_handle.cancel()
+            if track.end_at is not None:
+                player.stop()
+            logger.info("Finished playing: %s", track.file)
+        finally:
+            self._cancel_volume_transition()  # the player is reused, a leftover fade-in would ramp up the next track
+            self._detach_events(self._event_manager)
+
+    def _get_vlc_instance(self) -> vlc.Instance:
+        """
+        Returns the VLC instance that is shared by the media player and all media. It is created on first use.
+        """
+        if self._vlc_instance is None:
+            self._vlc_instance = vlc.Instance(["--quiet", "--no-video"])
+        return self._vlc_instance
+
+    def _get_player(self) -> vlc.MediaPlayer:
+        """
+        Returns the media player that plays every track, so that VLC does not have to set up the audio output
+        again for each track. It is created on first use.
+        """
+        if self._player is None:
+            self._player = vlc.MediaPlayer(self._get_vlc_instance())
+            # python-vlc creates a new wrapper on every call of `event_manager()`, but attached callbacks only stay
+            # alive (and can only be detached) through the wrapper that attached them
+            self._event_manager = self._player.event_manager()
+        return self._player
 
-    async def _wait_for_current_player_to_be_playing(self):
+    def _get_track_path(self, group: MusicGroup, track_list: TrackList, track: Track, root_directory=None) -> str:
         """
-        Waits until the `current_player` is playing.
+        Returns the path of the given track. Files that have been found once are not checked again, so playing a
+        track list on loop does not hit the file system for every track.
+        Raises a `ValueError` if the path is not valid.
         """
-        if self._current_player is not None:
-            while not self._current_player.is_playing():
-                await asyncio.sleep(self.SLEEP_TIME)
+        return utils.get_track_path(
+            group,
+            track_list,
+            track,
+            default_dir=self.directory,
+            root_directory=root_directory,
+            verified_paths=self._verified_paths,
+        )
+
+    async def _get_media(
+        self, group: MusicGroup, track_list: TrackList, track: Track, root_directory=None
+    ) -> vlc.Media:
+        """
+        Returns the media for the given track. If the track is being preloaded, the preload is waited for and its
+        media is used. Otherwise the path is resolved in an executor, like in `_preload_track()`.
+        Raises a `CancelledError` if the track does not point to a valid path.
+        """
+        preloaded_media, self._preloaded_media = self._preloaded_media, None
+        if preloaded_media is not None:
+            if preloaded_media.track is track:
+                media = await preloaded_media.task
+                if media is not None:
+                    return media
+            else:
+                preloaded_media.task.cancel()
+        loop = asyncio.get_event_loop()
+        try:
+            path = await loop.run_in_executor(None, self._get_track_path, group, track_list, track, root_directory)
+        except ValueError:
+            logger.error("Failed to play '%s'.", track.file)
+            raise asyncio.CancelledError()
+        return self._get_vlc_instance().media_new(path)
+
+    async def _preload_track(
+        self, group: MusicGroup, track_list: TrackList, track: Track, root_directory=None
+    ) -> Optional[vlc.Media]:
+        """
+        Creates the media for the given track and lets VLC parse it in the background, so that the track can start
+        without delay once it is its turn. Returns `None` if the track could not be preloaded.
+        The path is resolved in an executor, since it may have to be looked up online (e.g. for YouTube tracks).
+        """
+        loop = asyncio.get_event_loop()
+        try:
+            path = await loop.run_in_executor(None, self._get_track_path, group, track_list, track, root_directory)
+        except asyncio.CancelledError:
+            raise
+        except Exception:  # e.g. an invalid path or a failed YouTube lookup, `_get_media()` reports it later
+            logger.debug("Failed to preload '%s'", track.file, exc_info=True)
+            return None
+        media = self._get_vlc_instance().media_new(path)
+        media.parse_with_options(vlc.MediaParseFlag.local, 0)
+        return media
+
+    def _cancel_preload(self):
+        """
+        Cancels the preload of the next track, if there is one.
+        """
+        if self._preloaded_media is not None:
+            self._preloaded_media.task.cancel()
+            self._preloaded_media = None
+
+    def _get_playing_event(self, event_manager: vlc.EventManager) -> asyncio.Event:
+        """
+        Returns an event that is set once the player of the `event_manager` started playing.
+        VLC emits its events from its own thread, therefore the event is set through the event loop.
+        """
+        loop = asyncio.get_event_loop()
+        playing = asyncio.Event()
+
+        def set_playing(event):
+            loop.call_soon_threadsafe(playing.set)
+
+        event_manager.event_attach(vlc.EventType.MediaPlayerPlaying, set_playing)
+        return playing
+
+    def _get_finished_event(self, event_manager: vlc.EventManager) -> asyncio.Event:
+        """
+        Returns an event that is set once the player of the `event_manager` finished playing, i.e. it reached the
+        end of the media, was stopped or encountered an error.
+        VLC emits its events from its own thread, therefore the event is set through the event loop.
+        """
+        loop = asyncio.get_event_loop()
+        finished = asyncio.Event()
+
+        def set_finished(event):
+            loop.call_soon_threadsafe(finished.set)
+
+        event_manager.event_attach(vlc.EventType.MediaPlayerEndReached, set_finished)
+        event_manager.event_attach(vlc.EventType.MediaPlayerStopped, set_finished)
+        event_manager.event_attach(vlc.EventType.MediaPlayerEncounteredError, set_finished)
+        return finished
+
+    def _detach_events(self, event_manager: vlc.EventManager):
+        """
+        Detaches the callbacks attached by `_get_playing_event()` and `_get_finished_event()`, since the player
+        is reused for the next track. The `event_manager` must be the one the callbacks were attached through.
+        """
+        for event_type in (
+            vlc.EventType.MediaPlayerPlaying,
+            vlc.EventType.MediaPlayerEndReached,
+            vlc.EventType.MediaPlayerStopped,
+            vlc.EventType.MediaPlayerEncounteredError,
+        ):
+            event_manager.event_detach(event_type)
+
+    async def _wait_for_current_player_to_be_playing(self, playing: asyncio.Event, finished: asyncio.Event) -> bool:
+        """
+        Waits until the `current_player` is playing, which is signalled by the `playing` event.
+        If the event is not set within `PLAYING_TIMEOUT` seconds, fall back to polling the player.
+        Waiting stops early once the `finished` event is set, e.g. if the player encountered an error.
+        Returns whether the player started playing before it finished.
+        """
+        waiters = [asyncio.ensure_future(playing.wait()), asyncio.ensure_future(finished.wait())]
+        try:
+            done, _ = await asyncio.wait(waiters, timeout=self.PLAYING_TIMEOUT, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for waiter in waiters:
+                waiter.cancel()
+        if done:
+            return playing.is_set()
+        while not finished.is_set() and self._current_player is not None and not self._current_player.is_playing():
+            await asyncio.sleep(self.SLEEP_TIME)
+        return not finished.is_set()
 
     async def _play_next_track_list(self, request, current_track_list: TrackList):
         """
@@ -197,7 +398,7 @@ class MusicManager:
                     next_track_list_index = _track_list_index
                     break
         if next_group_index is None or next_track_list_index is None:
-            logger.error(f"Could not find a track list named '{current_track_list.name}'")
+            logger.error("Could not find a track list named '%s'", current_track_list.name)
         else:
             await self.play_track_list(request, next_group_index, next_track_list_index)
 
@@ -210,10 +411,14 @@ class MusicManager:
             action=MusicActions.MASTER_VOLUME, request=request, music_info=self.currently_playing
         )
 
-    async def _set_master_volume(self, volume, set_global=True, smooth=True, n_steps=20, seconds=2):
+    async def _set_master_volume(
+        self, volume, set_global=True, smooth=True, n_steps=20, seconds=VOLUME_TRANSITION_SECONDS
+    ):
         """
         Sets the master volume for the music. If music is being played, the volume of the player will be adjusted
-        accordingly.
+        accordingly. A smooth transition is scheduled on the event loop, i.e. this method does not wait for it
+        to finish. Any transition that is still in progress is cancelled, unless the music is fading out after a
+        cancellation. In that case the player is left alone.
 
         :param volume: new volume, a value between 0 (mute) and 100 (max)
         :param set_global: whether to set this as the new global volume
@@ -221,23 +426,33 @@ class MusicManager:
         :param n_steps: how many steps the transitions incorporates
         :param seconds: the time in which the transitions takes place
         """
-        if self._current_player is not None:
+        if self._current_player is not None and not self._fading_out:
             track_list = self.groups[self._currently_playing.group_index].track_lists[
                 self.currently_playing.track_list_index
             ]
             new_volume = (volume * track_list.volume) // 100
+            self._cancel_volume_transition()
             if not smooth:
                 self._current_player.audio_set_volume(new_volume)
             else:
+                loop = asyncio.get_event_loop()
                 current_volume = self._current_player.audio_get_volume()
                 step_size = (current_volume - new_volume) / n_steps
                 for i in range(n_steps):
                     volume_step = int(current_volume - (i + 1) * step_size)
-                    self._current_player.audio_set_volume(volume_step)
-                    await asyncio.sleep(seconds / n_steps)
+                    handle = loop.call_later(i * seconds / n_steps, self._current_player.audio_set_volume, volume_step)
+                    self._volume_transition_handles.append(handle)
         if set_global:
             self.volume = volume
-            logger.info(f"Changed music master volume to {volume}")
+            logger.info("Changed music master volume to %s", volume)
+
+    def _cancel_volume_transition(self):
+        """
+        Cancels the remaining steps of a smooth volume transition, if one is in progress.
+        """
+        for handle in self._volume_transition_handles:
+            handle.cancel()
+        self._volume_transition_handles = []
 
     async def set_track_list_volume(self, request: Request, group_index: int, track_list_index: int, volume: int):
         """
@@ -254,10 +469,12 @@ class MusicManager:
 
         if (
             self._current_player is not None
+            and not self._fading_out
             and self._currently_playing.group_index == group_index
             and self._currently_playing.track_list_index == track_list_index
         ):
             new_volume = (self.volume * track_list.volume) // 100
+            self._cancel_volume_transition()
             self._current_player.audio_set_volume(new_volume)
         await self.callback_handler(
             action=MusicActions.TRACK_LIST_VOLUME,
@@ -266,4 +483,4 @@ class MusicManager:
                 group_index, group.name, track_list_index, track_list.name, self.volume, track_list.volume
             ),
         )
-        logger.info(f"Changed tracklist volume for group={group_index}, track_list={track_list_index} to {volume}")
+        logger.info("Changed tracklist volume for group=%s, track_list=%s to %s", group_index, track_list_index, volume)
@@ -1,10 +1,25 @@
 import re
 import time
+from functools import lru_cache
 from typing import Dict, Union
 
 
+@lru_cache(maxsize=256)
+def _convert_formatted_time_to_ms(formatted_time: str) -> int:
+    """
+    Converts a string in the format %H:%M:%S to the corresponding number of milliseconds.
+    The results are cached since configs tend to repeat the same times and parsing them is expensive.
+
+    :param formatted_time: string in the format %H:%M:%S
+    """
+    time_struct = time.strptime(formatted_time, "%H:%M:%S")
+    return (time_struct.tm_sec + time_struct.tm_min * 60 + time_struct.tm_hour * 3600) * 1000
+
+
 class Track:
 
+    __slots__ = ("file", "start_at", "end_at")
+
     youtube_regex = re.compile(r"^(http(s)?:\/\/)?((w){3}.)?youtu(be|.be)?(\.com)?\/.+")
 
     def __init__(self, config: Union[str, Dict]):
@@ -25,19 +40,10 @@ class Track:
             end_at = None
         else:
             self.file = config["file"]
-            start_at = None if "start_at" not in config else config["start_at"]
-            end_at = None if "end_at" not in config else config["end_at"]
-        self.start_at = self._convert_formatted_time_to_ms(start_at) if start_at is not None else None
-        self.end_at = self._convert_formatted_time_to_ms(end_at) if end_at is not None else None
-
-    def _convert_formatted_time_to_ms(self, formatted_time: str) -> int:
-        """
-        Converts a string in the format %H:%M:%S to the corresponding number of milliseconds.
-
-        :param formatted_time: string in the format %H:%M:%S
-        """
-        time_struct = time.strptime(formatted_time, "%H:%M:%S")
-        return (time_struct.tm_sec + time_struct.tm_min * 60 + time_struct.tm_hour * 3600) * 1000
+            start_at = config.get("start_at")
+            end_at = config.get("end_at")
+        self.start_at = _convert_formatted_time_to_ms(start_at) if start_at is not None else None
+        self.end_at = _convert_formatted_time_to_ms(end_at) if end_at is not None else None
 
     @property
     def is_youtube_link(self):
@@ -1,10 +1,13 @@
 import random
-from typing import Dict, List
+from typing import Dict, Sequence
 
 from src.music.track import Track
 
 
 class TrackList:
+
+    __slots__ = ("name", "directory", "volume", "loop", "shuffle", "next", "_tracks")
+
     def __init__(self, config: Dict):
         """
         Initializes a `TrackList` instance.
@@ -21,40 +24,28 @@ class TrackList:
         :param config: `dict`
         """
         self.name = config["name"]
-        self.directory = config["directory"] if "directory" in config else None
-        self.volume = int(config["volume"]) if "volume" in config else 100
-        self.loop = config["loop"] if "loop" in config else True
-        self.shuffle = config["shuffle"] if "shuffle" in config else True
-        self.next = config["next"] if "next" in config else None
+        self.directory = config.get("directory")
+        self.volume = int(config.get("volume", 100))
+        self.loop = config.get("loop", True)
+        self.shuffle = config.get("shuffle", True)
+        self.next = config.get("next")
         tracks = [Track(track_config) for track_config in config["tracks"]]
         self._tracks = tuple(tracks)  # immutable
 
     @property
-    def tracks(self) -> List[Track]:
+    def tracks(self) -> Sequence[Track]:
         """
-        Returns the tracks for this instance. This list is shuffled, if `shuffle` is set.
+        Returns the tracks for this instance. If `shuffle` is set, a shuffled list is returned.
         """
-        tracks = list(self._tracks)  # Copy since random will shuffle in place
         if self.shuffle:
-            random.shuffle(tracks)
-        return tracks
+            return random.sample(self._tracks, len(self._tracks))
+        return self._tracks
+
+    def _key(self):
+        """
+        Returns a tuple of the attributes that are compared for equality.
+        """
+        return self.name, self.directory, self.loop, self.shuffle, self.volume, self.next, self._tracks
 
     def __eq__(self, other):
-        if isinstance(other, TrackList):
-            attrs_are_the_same = (
-                self.name == other.name
-                and self.directory == other.directory
-                and self.loop == other.loop
-                and self.shuffle == other.shuffle
-                and self.volume == other.volume
-                and self.next == other.next
-            )
-            if not attrs_are_the_same:
-                return False
-            if len(self._tracks) != len(other._tracks):
-                return False
-            for my_track, other_track in zip(self._tracks, other._tracks):
-                if my_track != other_track:
-                    return False
-            return True
-        return False
+        return isinstance(other, TrackList) and self._key() == other._key()
@@ -1,7 +1,7 @@
 import logging
 import os
 from functools import lru_cache
-from typing import Generator, Iterable, Tuple
+from typing import Generator, Iterable, Set, Tuple
 
 import pafy
 
@@ -52,7 +52,14 @@ def get_track_list_root_directory(group: MusicGroup, track_list: TrackList, defa
     return root_directory
 
 
-def get_track_path(group: MusicGroup, track_list: TrackList, track: Track, default_dir=None) -> str:
+def get_track_path(
+    group: MusicGroup,
+    track_list: TrackList,
+    track: Track,
+    default_dir=None,
+    root_directory=None,
+    verified_paths: Set[str] = None,
+) -> str:
     """
     Returns the path of the `Track` instance that should be played.
 
@@ -66,21 +73,29 @@ def get_track_path(group: MusicGroup, track_list: TrackList, track: Track, defau
     :param track_list: `TrackList` where the `track` is in
     :param track: the `Track` instance that should be played
     :param default_dir: the default directory to use if no other is specified
+    :param root_directory: the root directory of the `track_list` if it is already known (Optional)
+    :param verified_paths: file paths known to exist, these are not checked again. Newly checked paths are
+        added (Optional)
     :return: path to the `track` location that the VLC player can understand
     """
     if track.is_youtube_link:
         return get_audio_stream(track.file)
-    try:
-        root_directory = get_track_list_root_directory(group, track_list, default_dir=default_dir)
-    except ValueError as error:
-        logger.error(
-            f"Unknown directory for {track.file}. "
-            f"You have to specify the directory on either the default level, "
-            f"group level or track list level."
-        )
-        raise error
+    if root_directory is None:
+        try:
+            root_directory = get_track_list_root_directory(group, track_list, default_dir=default_dir)
+        except ValueError as error:
+            logger.error(
+                f"Unknown directory for {track.file}. "
+                f"You have to specify the directory on either the default level, "
+                f"group level or track list level."
+            )
+            raise error
     file_path = os.path.join(root_directory, track.file)
+    if verified_paths is not None and file_path in verified_paths:
+        return file_path
     if not os.path.isfile(file_path):
         logger.error(f"File {file_path} does not exist")
         raise ValueError(f"The path {file_path} does not point to an existing file.")
+    if verified_paths is not None:
+        verified_paths.add(file_path)
     return file_path
@@ -18,7 +18,7 @@ class TestMusicChecker:
         groups = []
         MusicChecker().do_all_checks(groups, "default/dir/")
         check_track_list_names_mock.assert_called_once_with(groups)
-        check_tracks_do_exist_mock.assert_called_once_with(groups, "default/dir/")
+        check_tracks_do_exist_mock.assert_called_once_with(groups, "default/dir/", None)
 
     def test_check_track_list_names_raises_error_if_duplicate_name(self):
         """
@@ -66,15 +66,33 @@ class TestMusicChecker:
             {"name": "Group 1", "track_lists": [{"name": "Track List 1", "tracks": ["track-1.mp3", "track-2.mp3"]}]}
         )
         group_2 = MusicGroup({"name": "Group 2", "track_lists": [{"name": "Track List 2", "tracks": ["track-3.mp3"]}]})
+        verified_paths = set()
+        kwargs = {"default_dir": "default/dir/", "verified_paths": verified_paths}
         expected_calls = [
-            call(group_1, group_1.track_lists[0], group_1.track_lists[0]._tracks[0], default_dir="default/dir/"),
-            call(group_1, group_1.track_lists[0], group_1.track_lists[0]._tracks[1], default_dir="default/dir/"),
-            call(group_2, group_2.track_lists[0], group_2.track_lists[0]._tracks[0], default_dir="default/dir/"),
+            call(group_1, group_1.track_lists[0], group_1.track_lists[0]._tracks[0], **kwargs),
+            call(group_1, group_1.track_lists[0], group_1.track_lists[0]._tracks[1], **kwargs),
+            call(group_2, group_2.track_lists[0], group_2.track_lists[0]._tracks[0], **kwargs),
         ]
-        MusicChecker().check_tracks_do_exist([group_1, group_2], "default/dir/")
+        MusicChecker().check_tracks_do_exist([group_1, group_2], "default/dir/", verified_paths)
         assert get_track_path_mock.call_count == 3  # There are three tracks in total to check
         get_track_path_mock.assert_has_calls(expected_calls, any_order=True)
 
+    def test_check_tracks_do_exist_adds_existing_files_to_verified_paths(self, monkeypatch):
+        """
+        Test that the paths of the existing files are added to `verified_paths`.
+        """
+        monkeypatch.setattr("src.music.utils.os.path.isfile", lambda x: True)
+        group = MusicGroup(
+            {
+                "name": "Group 1",
+                "directory": "group/dir/",
+                "track_lists": [{"name": "Track List 1", "tracks": ["track-1.mp3", "track-2.mp3"]}],
+            }
+        )
+        verified_paths = set()
+        MusicChecker().check_tracks_do_exist([group], None, verified_paths)
+        assert verified_paths == {"group/dir/track-1.mp3", "group/dir/track-2.mp3"}
+
     def test_check_tracks_do_exist_does_not_raise_on_valid_youtube_video(self):
         """
         Test that the `check_tracks_do_exist()` method does not raise an error on existing YouTube videos.
@@ -2,10 +2,11 @@ import asyncio
 from unittest.mock import MagicMock, PropertyMock, call
 
 import pytest
+import vlc
 from asynctest import CoroutineMock
 
 from src.music import MusicGroup, MusicManager, Track
-from src.music.music_manager import CurrentlyPlaying
+from src.music.music_manager import CurrentlyPlaying, PreloadedMedia
 
 
 class TestMusicManager:
@@ -20,6 +21,26 @@ class TestMusicManager:
             manager = MusicManager(config=example_config["music"])
         return manager
 
+    @pytest.fixture
+    def media_player_mock(self):
+        """
+        Returns a mock of a `vlc.MediaPlayer` that stores the callbacks attached to its events in `event_callbacks`.
+        Like python-vlc, `event_manager()` returns a new event manager on every call.
+        """
+        media_player_mock = MagicMock()
+        media_player_mock.event_callbacks = {}
+
+        def event_attach(event_type, callback):
+            media_player_mock.event_callbacks[event_type] = callback
+
+        def event_manager():
+            event_manager_mock = MagicMock()
+            event_manager_mock.event_attach = MagicMock(side_effect=event_attach)
+            return event_manager_mock
+
+        media_player_mock.event_manager = MagicMock(side_effect=event_manager)
+        return media_player_mock
+
     def test_minimal_dict_as_config(self, minimal_music_manager_config):
         music_manager = MusicManager(minimal_music_manager_config)
         assert music_manager.volume == 50
@@ -98,19 +119,40 @@ class TestMusicManager:
         do_all_checks_mock = MagicMock()
         monkeypatch.setattr("src.music.music_manager.MusicChecker.do_all_checks", do_all_checks_mock)
         manager = MusicManager({"volume": 1, "directory": "default/dir/", "groups": []})
-        do_all_checks_mock.assert_called_once_with(manager.groups, manager.directory)
+        do_all_checks_mock.assert_called_once_with(manager.groups, manager.directory, manager._verified_paths)
+
+    def test_root_directories_are_looked_up_on_initialization(self, minimal_music_manager_config):
+        minimal_music_manager_config["directory"] = "default/dir/"
+        minimal_music_manager_config["groups"] = [
+            {
+                "name": "Group",
+                "track_lists": [
+                    {"name": "Default Dir", "tracks": []},
+                    {"name": "Track List Dir", "directory": "track/list/dir/", "tracks": []},
+                ],
+            }
+        ]
+        music_manager = MusicManager(minimal_music_manager_config)
+        assert music_manager._root_directories == {(0, 0): "default/dir/", (0, 1): "track/list/dir/"}
+
+    def test_root_directory_is_none_if_not_specified(self, minimal_music_manager_config):
+        minimal_music_manager_config["groups"] = [{"name": "Group", "track_lists": [{"name": "List", "tracks": []}]}]
+        music_manager = MusicManager(minimal_music_manager_config)
+        assert music_manager._root_directories == {(0, 0): None}
 
     async def test_cancel_cancels_currently_playing(self, example_music_manager, monkeypatch):
         """
         Calling cancel() will cancel whatever is currently_playing and wait for it to reset the state.
         """
 
-        def reset(x):
+        def reset():
             example_music_manager._currently_playing = None
+            example_music_manager._stopped.set()
 
-        monkeypatch.setattr("src.music.music_manager.asyncio.sleep", CoroutineMock(side_effect=reset))
         currently_playing_mock = MagicMock()
+        currently_playing_mock.task.cancel = MagicMock(side_effect=reset)
         example_music_manager._currently_playing = currently_playing_mock
+        example_music_manager._stopped = asyncio.Event()
         await example_music_manager.cancel()
         assert example_music_manager._currently_playing is None
         currently_playing_mock.task.cancel.assert_called_once()
@@ -142,13 +184,16 @@ class TestMusicManager:
         monkeypatch.setattr("src.music.music_manager.MusicManager._play_track", play_track_mock)
         group = example_music_manager.groups[0]
         track_list = group.track_lists[0]
-        track_list._tracks = [Track("track-1.mp3"), Track("track-2.mp3")]
+        track_list._tracks = (Track("track-1.mp3"), Track("track-2.mp3"))
         track_list.loop = False
+        track_list.shuffle = False
         await example_music_manager._play_track_list(request=None, group_index=0, track_list_index=0)
         assert play_track_mock.await_count == 2
-        play_track_mock.assert_has_awaits(
-            [call(group, track_list, track_list._tracks[0]), call(group, track_list, track_list._tracks[1])],
-            any_order=True,
+        play_track_mock.assert_has_awaits(  # the track after the current one is passed on to be preloaded
+            [
+                call(group, track_list, track_list._tracks[0], track_list._tracks[1], "path/to/scene-1"),
+                call(group, track_list, track_list._tracks[1], None, "path/to/scene-1"),
+            ]
         )
 
     async def test_play_track_list_loops(self, example_music_manager, monkeypatch):
@@ -163,11 +208,28 @@ class TestMusicManager:
         track_list.tracks = [Track("track-1.mp3"), Track("track-2.mp3")]
         loop_property = PropertyMock(side_effect=[True, False])
         type(track_list).loop = loop_property
-        group.track_lists = [track_list]
+        group.track_lists = (track_list,)
         await example_music_manager._play_track_list(request=None, group_index=0, track_list_index=0)
         assert play_track_mock.await_count == 4  # loops once again over two tracks
         assert loop_property.call_count == 2
 
+    async def test_play_track_list_reshuffles_tracks_for_every_loop(self, example_music_manager, monkeypatch):
+        """
+        If the `shuffle` attribute is set on the track_list, the tracks are shuffled again before every loop.
+        """
+        monkeypatch.setattr("src.music.music_manager.MusicManager._play_track", CoroutineMock())
+        shuffle_mock = MagicMock()
+        monkeypatch.setattr("src.music.music_manager.random.shuffle", shuffle_mock)
+        group = example_music_manager.groups[0]
+        track_list = MagicMock()
+        track_list.tracks = [Track("track-1.mp3"), Track("track-2.mp3")]
+        track_list.shuffle = True
+        type(track_list).loop = PropertyMock(side_effect=[True, True, False])
+        group.track_lists = (track_list,)
+        await example_music_manager._play_track_list(request=None, group_index=0, track_list_index=0)
+        assert shuffle_mock.call_count == 2  # tracks are shuffled for the second and third time they are played
+        shuffle_mock.assert_called_with(track_list.tracks)
+
     async def test_play_track_list_raises_cancelled_error_if_playing_a_track_is_cancelled(
         self, example_music_manager, monkeypatch
     ):
@@ -180,7 +242,7 @@ class TestMusicManager:
         )
         group = example_music_manager.groups[0]
         track_list = group.track_lists[0]
-        track_list._tracks = [Track("track-1.mp3"), Track("track-2.mp3")]
+        track_list._tracks = (Track("track-1.mp3"), Track("track-2.mp3"))
         with pytest.raises(asyncio.CancelledError):
             await example_music_manager._play_track_list(request=None, group_index=0, track_list_index=0)
 
@@ -195,7 +257,7 @@ class TestMusicManager:
         group = example_music_manager.groups[0]
         track_list = group.track_lists[0]
         track_list.loop = False
-        track_list._tracks = [Track("track-1.mp3"), Track("track-2.mp3")]
+        track_list._tracks = (Track("track-1.mp3"), Track("track-2.mp3"))
         current_player_mock = MagicMock()
         example_music_manager._current_player = current_player_mock
         await example_music_manager._play_track_list(request=None, group_index=0, track_list_index=0)
@@ -212,15 +274,30 @@ class TestMusicManager:
         )
         group = example_music_manager.groups[0]
         track_list = group.track_lists[0]
-        track_list._tracks = [Track("track-1.mp3"), Track("track-2.mp3")]
+        track_list._tracks = (Track("track-1.mp3"), Track("track-2.mp3"))
         current_player_mock = MagicMock()
         example_music_manager._current_player = current_player_mock
+        handle_mock = MagicMock()
+        example_music_manager._volume_transition_handles = [handle_mock]
         with pytest.raises(asyncio.CancelledError):
             await example_music_manager._play_track_list(request=None, group_index=0, track_list_index=0)
         current_player_mock.stop.assert_called_once()
+        handle_mock.cancel.assert_called_once()
         assert example_music_manager._currently_playing is None
         assert example_music_manager._current_player is None
 
+    async def test_play_track_list_signals_that_it_stopped(self, example_music_manager, monkeypatch):
+        """
+        Once the state is reset, the `_stopped` event should be set so that `cancel()` can stop waiting.
+        """
+        monkeypatch.setattr(
+            "src.music.music_manager.MusicManager._play_track", CoroutineMock(side_effect=asyncio.CancelledError)
+        )
+        example_music_manager._stopped = asyncio.Event()
+        with pytest.raises(asyncio.CancelledError):
+            await example_music_manager._play_track_list(request=None, group_index=0, track_list_index=0)
+        assert example_music_manager._stopped.is_set()
+
     async def test_play_track_list_starts_next_track_list_if_finishes_playing(self, example_music_manager, monkeypatch):
         """
         If `_play_track_list()` finishes playing a track_list, `_play_next_track_list()` should be called with the
@@ -299,6 +376,7 @@ class TestMusicManager:
         media_player_mock = MagicMock()
         media_player_mock.play.return_value = -1
         monkeypatch.setattr("src.music.music_manager.vlc.MediaPlayer", MagicMock(return_value=media_player_mock))
+        monkeypatch.setattr("src.music.music_manager.vlc.Instance", MagicMock())
         monkeypatch.setattr("src.music.music_manager.utils.get_track_path", MagicMock(return_value="url"))
         group = example_music_manager.groups[0]
         track_list = group.track_lists[0]
@@ -306,57 +384,83 @@ class TestMusicManager:
         with pytest.raises(asyncio.CancelledError):
             await example_music_manager._play_track(group=group, track_list=track_list, track=track)
 
+    async def test_play_track_cancels_if_player_finishes_before_playing(
+        self, example_music_manager, media_player_mock, monkeypatch
+    ):
+        """
+        If the media player finishes before it starts playing, e.g. because it encountered an error, raise a
+        CancelledError without fading in.
+        """
+        media_player_mock.play = MagicMock(
+            side_effect=lambda: media_player_mock.event_callbacks[vlc.EventType.MediaPlayerEncounteredError](
+                MagicMock()
+            )
+        )
+        set_master_volume_mock = CoroutineMock()
+        monkeypatch.setattr("src.music.music_manager.vlc.MediaPlayer", MagicMock(return_value=media_player_mock))
+        monkeypatch.setattr("src.music.music_manager.vlc.Instance", MagicMock())
+        monkeypatch.setattr("src.music.music_manager.utils.get_track_path", MagicMock(return_value="url"))
+        monkeypatch.setattr("src.music.music_manager.MusicManager._set_master_volume", set_master_volume_mock)
+        group = example_music_manager.groups[0]
+        track_list = group.track_lists[0]
+        track, next_track = track_list.tracks
+        with pytest.raises(asyncio.CancelledError):
+            await example_music_manager._play_track(group, track_list, track, next_track)
+        set_master_volume_mock.assert_not_awaited()
+        assert example_music_manager._preloaded_media is None
+
     async def test_play_track_cancels_if_cancelled_error_is_raised_while_playing(
-        self, example_music_manager, monkeypatch
+        self, example_music_manager, media_player_mock, monkeypatch
     ):
         """
         If a CancelledError is raised while the music is playing, catch it, set the volume to zero and
         re-raise it.
         """
-        media_player_mock = MagicMock()
-        media_player_mock.is_playing.return_value = True
-        media_player_mock.get_time = MagicMock(side_effect=asyncio.CancelledError)  # some method in the try block
         set_master_volume_mock = CoroutineMock()
         monkeypatch.setattr("src.music.music_manager.vlc.MediaPlayer", MagicMock(return_value=media_player_mock))
+        monkeypatch.setattr("src.music.music_manager.vlc.Instance", MagicMock())
         monkeypatch.setattr("src.music.music_manager.utils.get_track_path", MagicMock(return_value="url"))
         monkeypatch.setattr(
             "src.music.music_manager.MusicManager._wait_for_current_player_to_be_playing", CoroutineMock()
         )
         monkeypatch.setattr("src.music.music_manager.MusicManager._set_master_volume", set_master_volume_mock)
-        monkeypatch.setattr("src.music.music_manager.asyncio.sleep", CoroutineMock())
+        example_music_manager.VOLUME_TRANSITION_SECONDS = 0
         group = example_music_manager.groups[0]
         track_list = group.track_lists[0]
         track = track_list.tracks[0]
-        track.end_at = 1000
+        task = asyncio.ensure_future(example_music_manager._play_track(group=group, track_list=track_list, track=track))
+        while not media_player_mock.play.called:  # the path is resolved in an executor
+            await asyncio.sleep(example_music_manager.SLEEP_TIME)
+        await asyncio.sleep(0)  # start playing and wait for the track to finish
+        task.cancel()
         with pytest.raises(asyncio.CancelledError):
-            await example_music_manager._play_track(group=group, track_list=track_list, track=track)
-        media_player_mock.get_time.assert_called_once()  # this raised the CancelledError which got re-raised
+            await task
         set_master_volume_mock.assert_awaited_with(0, set_global=False)
+        assert not example_music_manager._fading_out
 
-    async def test_play_track_plays_the_track(self, example_music_manager, monkeypatch):
+    async def test_play_track_plays_the_track(self, example_music_manager, media_player_mock, monkeypatch):
         """
         When a track is requested to be played, perform the following steps:
         - Get the path (url or file path) for the track
-        - Create a MediaPlayer instance
+        - Set the media of the track on the MediaPlayer instance
         - Call the play() method on the media player
         - Wait for it to start playing
         - Set the volume with _set_master_volume()
-        - While the media player is_playing(), wait
+        - Wait until the media player signals that it reached the end
         """
-        media_player_mock = MagicMock()
-        is_playing_mock = MagicMock(side_effect=[True, True, False])  # Only plays for 2 steps
-        media_player_mock.is_playing = is_playing_mock
+        media_player_mock.play = MagicMock(
+            side_effect=lambda: media_player_mock.event_callbacks[vlc.EventType.MediaPlayerEndReached](MagicMock())
+        )
         get_track_path_mock = MagicMock(return_value="url")
-        sleep_mock = CoroutineMock()
         wait_for_start_mock = CoroutineMock()
         set_master_volume_mock = CoroutineMock()  # necessary because it will use asyncio.sleep and mess up the numbers
         monkeypatch.setattr("src.music.music_manager.vlc.MediaPlayer", MagicMock(return_value=media_player_mock))
+        monkeypatch.setattr("src.music.music_manager.vlc.Instance", MagicMock())
         monkeypatch.setattr("src.music.music_manager.utils.get_track_path", get_track_path_mock)
         monkeypatch.setattr(
             "src.music.music_manager.MusicManager._wait_for_current_player_to_be_playing", wait_for_start_mock
         )
         monkeypatch.setattr("src.music.music_manager.MusicManager._set_master_volume", set_master_volume_mock)
-        monkeypatch.setattr("src.music.music_manager.asyncio.sleep", sleep_mock)
         example_music_manager.volume = 55
         group = example_music_manager.groups[0]
         track_list = group.track_lists[0]
@@ -366,22 +470,22 @@ class TestMusicManager:
         media_player_mock.play.assert_called_once()
         wait_for_start_mock.assert_awaited_once()
         set_master_volume_mock.assert_awaited_once_with(example_music_manager.volume, set_global=False)
-        assert is_playing_mock.call_count == 3  # is_playing becomes False at the 3rd call, so stop
-        assert sleep_mock.await_count == 2  # Two times for while player is playing
+        media_player_mock.stop.assert_not_called()
 
-    async def test_play_track_sets_start_time(self, example_music_manager, monkeypatch):
+    async def test_play_track_sets_start_time(self, example_music_manager, media_player_mock, monkeypatch):
         """
         If a `Track` has the `start_at` attribute, the media player should skip to it.
         """
-        media_player_mock = MagicMock()
-        media_player_mock.is_playing.return_value = False
+        media_player_mock.play = MagicMock(
+            side_effect=lambda: media_player_mock.event_callbacks[vlc.EventType.MediaPlayerEndReached](MagicMock())
+        )
         monkeypatch.setattr("src.music.music_manager.vlc.MediaPlayer", MagicMock(return_value=media_player_mock))
+        monkeypatch.setattr("src.music.music_manager.vlc.Instance", MagicMock())
         monkeypatch.setattr("src.music.music_manager.utils.get_track_path", MagicMock(return_value="url"))
         monkeypatch.setattr(
             "src.music.music_manager.MusicManager._wait_for_current_player_to_be_playing", CoroutineMock()
         )
         monkeypatch.setattr("src.music.music_manager.MusicManager._set_master_volume", CoroutineMock())
-        monkeypatch.setattr("src.music.music_manager.asyncio.sleep", CoroutineMock())
         group = example_music_manager.groups[0]
         track_list = group.track_lists[0]
         track = track_list.tracks[0]
@@ -389,45 +493,240 @@ class TestMusicManager:
         await example_music_manager._play_track(group=group, track_list=track_list, track=track)
         media_player_mock.set_time.assert_called_once_with(1000)
 
-    async def test_play_track_stops_at_end_time(self, example_music_manager, monkeypatch):
+    async def test_play_track_stops_at_end_time(self, example_music_manager, media_player_mock, monkeypatch):
         """
-        If a `Track` has the `end_at` attribute, the media player should stop if it is reached.
+        If a `Track` has the `end_at` attribute, the media player should stop once it is reached.
         """
-        media_player_mock = MagicMock()
-        media_player_mock.is_playing.return_value = True  # Can only exit if stop() is called
+        monkeypatch.setattr("src.music.music_manager.vlc.MediaPlayer", MagicMock(return_value=media_player_mock))
+        monkeypatch.setattr("src.music.music_manager.vlc.Instance", MagicMock())
+        monkeypatch.setattr("src.music.music_manager.utils.get_track_path", MagicMock(return_value="url"))
+        monkeypatch.setattr(
+            "src.music.music_manager.MusicManager._wait_for_current_player_to_be_playing", CoroutineMock()
+        )
+        monkeypatch.setattr("src.music.music_manager.MusicManager._set_master_volume", CoroutineMock())
+        group = example_music_manager.groups[0]
+        track_list = group.track_lists[0]
+        track = track_list.tracks[0]
+        track.start_at = 1000
+        track.end_at = 1010  # i.e. the track is played for 10 ms
+        await example_music_manager._play_track(group=group, track_list=track_list, track=track)
+        media_player_mock.stop.assert_called_once()
+
+    async def test_play_track_reuses_the_media_player(self, example_music_manager, media_player_mock, monkeypatch):
+        """
+        The same media player should be used for every track and its event callbacks should be detached after each
+        track.
+        """
+        media_player_mock.play = MagicMock(
+            side_effect=lambda: media_player_mock.event_callbacks[vlc.EventType.MediaPlayerEndReached](MagicMock())
+        )
+        media_player_class_mock = MagicMock(return_value=media_player_mock)
+        monkeypatch.setattr("src.music.music_manager.vlc.MediaPlayer", media_player_class_mock)
+        monkeypatch.setattr("src.music.music_manager.vlc.Instance", MagicMock())
+        monkeypatch.setattr("src.music.music_manager.utils.get_track_path", MagicMock(return_value="url"))
+        monkeypatch.setattr(
+            "src.music.music_manager.MusicManager._wait_for_current_player_to_be_playing", CoroutineMock()
+        )
+        monkeypatch.setattr("src.music.music_manager.MusicManager._set_master_volume", CoroutineMock())
+        group = example_music_manager.groups[0]
+        track_list = group.track_lists[0]
+        for track in track_list.tracks:
+            await example_music_manager._play_track(group=group, track_list=track_list, track=track)
+        media_player_class_mock.assert_called_once()
+        assert media_player_mock.set_media.call_count == 2
+        media_player_mock.event_manager.assert_called_once()  # callbacks are attached and detached through it
+        event_manager_mock = example_music_manager._event_manager
+        assert event_manager_mock.event_attach.call_count == 8  # 4 events for each of the 2 tracks
+        assert event_manager_mock.event_detach.call_count == event_manager_mock.event_attach.call_count
+
+    async def test_play_track_cancels_volume_transition_once_finished(
+        self, example_music_manager, media_player_mock, monkeypatch
+    ):
+        """
+        A fade-in that is still in progress when the track finishes should not carry over to the next track.
+        """
+        media_player_mock.play = MagicMock(
+            side_effect=lambda: media_player_mock.event_callbacks[vlc.EventType.MediaPlayerEndReached](MagicMock())
+        )
+        volume_transition_handle = MagicMock()
 
-        def set_is_playing_to_false():
-            media_player_mock.is_playing.return_value = False
+        async def set_master_volume(volume, set_global=True):
+            example_music_manager._volume_transition_handles.append(volume_transition_handle)
 
-        media_player_mock.get_time.return_value = 1000
-        media_player_mock.stop = MagicMock(side_effect=set_is_playing_to_false)
         monkeypatch.setattr("src.music.music_manager.vlc.MediaPlayer", MagicMock(return_value=media_player_mock))
+        monkeypatch.setattr("src.music.music_manager.vlc.Instance", MagicMock())
         monkeypatch.setattr("src.music.music_manager.utils.get_track_path", MagicMock(return_value="url"))
         monkeypatch.setattr(
             "src.music.music_manager.MusicManager._wait_for_current_player_to_be_playing", CoroutineMock()
         )
-        monkeypatch.setattr("src.music.music_manager.MusicManager._set_master_volume", CoroutineMock())
-        monkeypatch.setattr("src.music.music_manager.asyncio.sleep", CoroutineMock())
+        monkeypatch.setattr(example_music_manager, "_set_master_volume", set_master_volume)
         group = example_music_manager.groups[0]
         track_list = group.track_lists[0]
         track = track_list.tracks[0]
-        track.end_at = 1000
         await example_music_manager._play_track(group=group, track_list=track_list, track=track)
-        media_player_mock.get_time.assert_called_once()  # Compares get_time with track.end_at and
-        assert media_player_mock.is_playing.call_count == 2  # immediately exits next step due to get_time >= end_at
-        media_player_mock.stop.assert_called_once()  # and calls stop()
+        volume_transition_handle.cancel.assert_called_once()
+        assert example_music_manager._volume_transition_handles == []
 
-    async def test_wait_for_current_player_to_be_playing(self, example_music_manager, monkeypatch):
+    async def test_play_track_preloads_next_track(self, example_music_manager, media_player_mock, monkeypatch):
         """
-        Wait until the current player is playing.
+        If a `next_track` is given, it should be preloaded in a task once the current track is playing.
         """
-        sleep_mock = CoroutineMock()
-        monkeypatch.setattr("src.music.music_manager.asyncio.sleep", sleep_mock)
+        media_player_mock.play = MagicMock(
+            side_effect=lambda: media_player_mock.event_callbacks[vlc.EventType.MediaPlayerEndReached](MagicMock())
+        )
+        preload_track_mock = CoroutineMock()
+        monkeypatch.setattr("src.music.music_manager.vlc.MediaPlayer", MagicMock(return_value=media_player_mock))
+        monkeypatch.setattr("src.music.music_manager.vlc.Instance", MagicMock())
+        monkeypatch.setattr("src.music.music_manager.utils.get_track_path", MagicMock(return_value="url"))
+        monkeypatch.setattr(
+            "src.music.music_manager.MusicManager._wait_for_current_player_to_be_playing", CoroutineMock()
+        )
+        monkeypatch.setattr("src.music.music_manager.MusicManager._set_master_volume", CoroutineMock())
+        monkeypatch.setattr("src.music.music_manager.MusicManager._preload_track", preload_track_mock)
+        group = example_music_manager.groups[0]
+        track_list = group.track_lists[0]
+        track, next_track = track_list.tracks
+        await example_music_manager._play_track(group, track_list, track, next_track)
+        assert example_music_manager._preloaded_media.track is next_track
+        await example_music_manager._preloaded_media.task
+        preload_track_mock.assert_awaited_once_with(group, track_list, next_track, None)
+
+    async def test_preload_track_creates_and_parses_media(self, example_music_manager, monkeypatch):
+        """
+        Preloading a track should create its media, start parsing it and return it.
+        """
+        vlc_instance_mock = MagicMock()
+        monkeypatch.setattr("src.music.music_manager.vlc.Instance", MagicMock(return_value=vlc_instance_mock))
+        monkeypatch.setattr("src.music.music_manager.utils.get_track_path", MagicMock(return_value="url"))
+        group = example_music_manager.groups[0]
+        track_list = group.track_lists[0]
+        track = track_list.tracks[0]
+        media = await example_music_manager._preload_track(group, track_list, track)
+        assert media is vlc_instance_mock.media_new.return_value
+        vlc_instance_mock.media_new.assert_called_once_with("url")
+        media.parse_with_options.assert_called_once()
+
+    async def test_preload_track_returns_none_if_the_path_lookup_fails(self, example_music_manager, monkeypatch):
+        """
+        If the path of the track cannot be looked up, e.g. due to a network error, the track is not preloaded.
+        """
+        vlc_instance_mock = MagicMock()
+        monkeypatch.setattr("src.music.music_manager.vlc.Instance", MagicMock(return_value=vlc_instance_mock))
+        monkeypatch.setattr("src.music.music_manager.utils.get_track_path", MagicMock(side_effect=OSError))
+        group = example_music_manager.groups[0]
+        track_list = group.track_lists[0]
+        track = track_list.tracks[0]
+        assert await example_music_manager._preload_track(group, track_list, track) is None
+        vlc_instance_mock.media_new.assert_not_called()
+
+    def test_vlc_instance_is_created_once(self, example_music_manager, monkeypatch):
+        """
+        All media players and media share a single VLC instance.
+        """
+        vlc_instance_class_mock = MagicMock()
+        monkeypatch.setattr("src.music.music_manager.vlc.Instance", vlc_instance_class_mock)
+        vlc_instance = example_music_manager._get_vlc_instance()
+        assert example_music_manager._get_vlc_instance() is vlc_instance
+        vlc_instance_class_mock.assert_called_once()
+
+    def test_get_player_keeps_the_event_manager(self, example_music_manager, media_player_mock, monkeypatch):
+        """
+        The event manager of the player is kept, since the callbacks attached through it only stay alive with it.
+        """
+        monkeypatch.setattr("src.music.music_manager.vlc.MediaPlayer", MagicMock(return_value=media_player_mock))
+        monkeypatch.setattr("src.music.music_manager.vlc.Instance", MagicMock())
+        example_music_manager._get_player()
+        example_music_manager._get_player()
+        media_player_mock.event_manager.assert_called_once()
+        assert example_music_manager._event_manager is not None
+
+    async def test_get_media_waits_for_preloaded_media(self, example_music_manager, monkeypatch):
+        """
+        If the track is being preloaded, the preload should be waited for and its media used instead of creating a
+        new one.
+        """
+        get_track_path_mock = MagicMock()
+        monkeypatch.setattr("src.music.music_manager.utils.get_track_path", get_track_path_mock)
+        group = example_music_manager.groups[0]
+        track_list = group.track_lists[0]
+        track = track_list.tracks[0]
+        media = MagicMock()
+        loop = asyncio.get_event_loop()
+        preload_task = loop.create_future()
+        loop.call_soon(preload_task.set_result, media)  # the preload is still pending
+        example_music_manager._preloaded_media = PreloadedMedia(track, preload_task)
+        assert await example_music_manager._get_media(group, track_list, track) is media
+        assert example_music_manager._preloaded_media is None
+        get_track_path_mock.assert_not_called()
+
+    async def test_get_media_cancels_preload_of_other_track(self, example_music_manager, monkeypatch):
+        """
+        If another track is being preloaded, the preload should be cancelled and the media created from the path.
+        """
+        vlc_instance_mock = MagicMock()
+        monkeypatch.setattr("src.music.music_manager.vlc.Instance", MagicMock(return_value=vlc_instance_mock))
+        monkeypatch.setattr("src.music.music_manager.utils.get_track_path", MagicMock(return_value="url"))
+        group = example_music_manager.groups[0]
+        track_list = group.track_lists[0]
+        track, other_track = track_list.tracks
+        preload_task = asyncio.get_event_loop().create_future()
+        example_music_manager._preloaded_media = PreloadedMedia(other_track, preload_task)
+        media = await example_music_manager._get_media(group, track_list, track)
+        assert media is vlc_instance_mock.media_new.return_value
+        vlc_instance_mock.media_new.assert_called_once_with("url")
+        assert preload_task.cancelled()
+
+    async def test_get_playing_event_is_set_once_player_is_playing(self, example_music_manager, media_player_mock):
+        """
+        The event returned by `_get_playing_event()` is set once VLC signals that the player is playing.
+        """
+        playing = example_music_manager._get_playing_event(media_player_mock.event_manager())
+        assert not playing.is_set()
+        media_player_mock.event_callbacks[vlc.EventType.MediaPlayerPlaying](MagicMock())
+        await asyncio.sleep(0)  # the event is set through the event loop
+        assert playing.is_set()
+
+    async def test_wait_for_current_player_to_be_playing(self, example_music_manager):
+        """
+        Wait until the `playing` event is set without polling the current player.
+        """
+        example_music_manager._current_player = MagicMock()
+        playing = asyncio.Event()
+        playing.set()
+        assert await example_music_manager._wait_for_current_player_to_be_playing(playing, asyncio.Event())
+        example_music_manager._current_player.is_playing.assert_not_called()
+
+    async def test_wait_for_current_player_to_be_playing_stops_once_finished(self, example_music_manager):
+        """
+        Stop waiting once the `finished` event is set, even if the current player never starts playing.
+        """
+        example_music_manager._current_player = MagicMock()
+        example_music_manager._current_player.is_playing = MagicMock(return_value=False)
+        finished = asyncio.Event()
+        finished.set()
+        assert not await example_music_manager._wait_for_current_player_to_be_playing(asyncio.Event(), finished)
+        example_music_manager._current_player.is_playing.assert_not_called()
+
+    async def test_wait_for_current_player_to_be_playing_stops_polling_once_finished(self, example_music_manager):
+        """
+        If the `playing` event is not set in time, poll the current player only until the `finished` event is set.
+        """
+        example_music_manager.PLAYING_TIMEOUT = 0
+        example_music_manager._current_player = MagicMock()
+        finished = asyncio.Event()
+        example_music_manager._current_player.is_playing = MagicMock(side_effect=lambda: finished.set())
+        assert not await example_music_manager._wait_for_current_player_to_be_playing(asyncio.Event(), finished)
+        example_music_manager._current_player.is_playing.assert_called_once()
+
+    async def test_wait_for_current_player_to_be_playing_polls_after_timeout(self, example_music_manager):
+        """
+        If the `playing` event is not set in time, wait until the current player is playing.
+        """
+        example_music_manager.PLAYING_TIMEOUT = 0
         example_music_manager._current_player = MagicMock()
         example_music_manager._current_player.is_playing = MagicMock(side_effect=[False, False, True])
-        await example_music_manager._wait_for_current_player_to_be_playing()
+        assert await example_music_manager._wait_for_current_player_to_be_playing(asyncio.Event(), asyncio.Event())
         assert example_music_manager._current_player.is_playing.call_count == 3
-        assert sleep_mock.await_count == 2
 
     async def test_set_master_volume_sets_volume_if_global_parameter(self, example_music_manager):
         example_music_manager.volume = 0
@@ -456,19 +755,46 @@ class TestMusicManager:
         self, example_music_manager, monkeypatch
     ):
         example_music_manager.groups[0].track_lists[0].volume = 50
-        sleep_mock = CoroutineMock()
-        monkeypatch.setattr("src.music.music_manager.asyncio.sleep", sleep_mock)
+        loop_mock = MagicMock()
+        monkeypatch.setattr("src.music.music_manager.asyncio.get_event_loop", MagicMock(return_value=loop_mock))
         example_music_manager._currently_playing = CurrentlyPlaying(0, 0, MagicMock())
-        example_music_manager._current_player = MagicMock()
-        example_music_manager._current_player.audio_get_volume.return_value = 0
+        player_mock = MagicMock()
+        player_mock.audio_get_volume.return_value = 0
+        example_music_manager._current_player = player_mock
         n_steps = 10
         seconds = 10
         await example_music_manager._set_master_volume(volume=100, smooth=True, n_steps=n_steps, seconds=seconds)
-        sleep_mock.assert_awaited_with(seconds / n_steps)  # seconds / n_steps
         step_size = 50 / n_steps  # 50 = abs(starting_volume(0) - new_volume(100*50//100))
-        example_music_manager._current_player.audio_set_volume.assert_has_calls(
-            [call(int((i + 1) * step_size)) for i in range(n_steps)]  # 5, 10, 15, ..., 50
+        loop_mock.call_later.assert_has_calls(  # every seconds / n_steps set the volume to 5, 10, 15, ..., 50
+            [
+                call(i * seconds / n_steps, player_mock.audio_set_volume, int((i + 1) * step_size))
+                for i in range(n_steps)
+            ]
         )
+        assert len(example_music_manager._volume_transition_handles) == n_steps
+
+    async def test_set_master_volume_cancels_previous_transition(self, example_music_manager):
+        example_music_manager._currently_playing = CurrentlyPlaying(0, 0, MagicMock())
+        example_music_manager._current_player = MagicMock()
+        handle_mock = MagicMock()
+        example_music_manager._volume_transition_handles = [handle_mock]
+        await example_music_manager._set_master_volume(volume=50, smooth=False)
+        handle_mock.cancel.assert_called_once()
+        assert example_music_manager._volume_transition_handles == []
+
+    async def test_set_master_volume_does_not_interrupt_fade_out(self, example_music_manager):
+        """
+        While the music fades out after a cancellation, a new master volume is only remembered for the next track.
+        """
+        example_music_manager._currently_playing = CurrentlyPlaying(0, 0, MagicMock())
+        example_music_manager._current_player = MagicMock()
+        handle_mock = MagicMock()
+        example_music_manager._volume_transition_handles = [handle_mock]
+        example_music_manager._fading_out = True
+        await example_music_manager._set_master_volume(volume=50, smooth=False)
+        assert example_music_manager.volume == 50
+        handle_mock.cancel.assert_not_called()
+        example_music_manager._current_player.audio_set_volume.assert_not_called()
 
     async def test_set_track_list_volume_sets_volume(self, example_music_manager):
         example_music_manager.groups[0].track_lists[0].volume = 75
@@ -484,3 +810,17 @@ class TestMusicManager:
         assert example_music_manager.groups[0].track_lists[0].volume == 50
         expected_volume = (50 * 50) // 100  # master volume times track list volume divided by 100
         example_music_manager._current_player.audio_set_volume.assert_called_once_with(expected_volume)
+
+    async def test_set_track_list_volume_does_not_interrupt_fade_out(self, example_music_manager):
+        """
+        While the music fades out after a cancellation, the new track list volume should not be set on the player.
+        """
+        example_music_manager._current_player = MagicMock()
+        example_music_manager._currently_playing = CurrentlyPlaying(0, 0, MagicMock())
+        handle_mock = MagicMock()
+        example_music_manager._volume_transition_handles = [handle_mock]
+        example_music_manager._fading_out = True
+        await example_music_manager.set_track_list_volume(MagicMock(), 0, 0, 50)
+        assert example_music_manager.groups[0].track_lists[0].volume == 50
+        handle_mock.cancel.assert_not_called()
+        example_music_manager._current_player.audio_set_volume.assert_not_called()
@@ -62,10 +62,11 @@ class TestTrackList:
     def test_tracks_are_shuffled_if_shuffle_is_set(self, minimal_track_list_config, monkeypatch):
         minimal_track_list_config["tracks"] = ["some-filename.mp3", "other-filename.mp3"]
         random_mock = MagicMock()
+        random_mock.sample = MagicMock(side_effect=lambda population, k: list(population))
         monkeypatch.setattr("src.music.track_list.random", random_mock)
         track_list = TrackList(minimal_track_list_config)
         assert len(track_list.tracks) == 2
-        random_mock.shuffle.assert_called_once()
+        random_mock.sample.assert_called_once_with(track_list._tracks, 2)
 
     def test_tracks_are_not_shuffled_if_shuffle_unset(self, minimal_track_list_config, monkeypatch):
         minimal_track_list_config["tracks"] = ["some-filename.mp3", "other-filename.mp3"]
@@ -74,7 +75,7 @@ class TestTrackList:
         monkeypatch.setattr("src.music.track_list.random", random_mock)
         track_list = TrackList(minimal_track_list_config)
         assert len(track_list.tracks) == 2
-        random_mock.shuffle.assert_not_called()
+        random_mock.sample.assert_not_called()
 
     def test_tracks_use_tuple_instead_of_list(self, minimal_track_list_config):
         track_list = TrackList(minimal_track_list_config)
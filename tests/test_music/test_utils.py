@@ -144,6 +144,19 @@ class TestGetTrackPath:
         path = utils.get_track_path(example_group, track_list, track)
         assert path == "root/dir/file.mp3"
 
+    def test_get_track_path_uses_given_root_directory(self, example_group, monkeypatch):
+        """
+        If the `root_directory` is passed, it should be used instead of looking it up again.
+        """
+        get_track_list_root_directory_mock = MagicMock()
+        monkeypatch.setattr("src.music.utils.get_track_list_root_directory", get_track_list_root_directory_mock)
+        monkeypatch.setattr("src.music.utils.os.path.isfile", lambda x: True)
+        track_list = example_group.track_lists[0]
+        track = track_list.tracks[0]
+        path = utils.get_track_path(example_group, track_list, track, root_directory="root/dir/")
+        assert path == "root/dir/track_1.mp3"
+        get_track_list_root_directory_mock.assert_not_called()
+
     def test_get_track_path_raises_value_error_if_root_directory_unknown(self, example_group):
         """
         If the `file` attribute of a `Track` is not the link to a YouTube video, return the file path. The file path
@@ -170,3 +183,31 @@ class TestGetTrackPath:
         )  # non-existing dir
         with pytest.raises(ValueError):
             utils.get_track_path(example_group, track_list, track)
+
+    def test_get_track_path_adds_existing_file_to_verified_paths(self, example_group, monkeypatch):
+        """
+        If `verified_paths` is passed, an existing file path is added to it.
+        """
+        monkeypatch.setattr("src.music.utils.os.path.isfile", lambda x: True)
+        track_list = example_group.track_lists[0]
+        track = track_list.tracks[0]
+        verified_paths = set()
+        path = utils.get_track_path(
+            example_group, track_list, track, root_directory="root/dir/", verified_paths=verified_paths
+        )
+        assert verified_paths == {path}
+
+    def test_get_track_path_does_not_check_verified_paths_again(self, example_group, monkeypatch):
+        """
+        If the file path is in `verified_paths`, it is returned without checking that the file exists.
+        """
+        isfile_mock = MagicMock()
+        monkeypatch.setattr("src.music.utils.os.path.isfile", isfile_mock)
+        track_list = example_group.track_lists[0]
+        track = track_list.tracks[0]
+        verified_paths = {"root/dir/track_1.mp3"}
+        path = utils.get_track_path(
+            example_group, track_list, track, root_directory="root/dir/", verified_paths=verified_paths
+        )
+        assert path == "root/dir/track_1.mp3"
+        isfile_mock.assert_not_called()